@@ -1,17 +1,28 @@
-import json
+import orjson
 import cv2
 import os
 import numpy as np
 import sys
 
 
-def yolo_to_bbox(x_center, y_center, width, height, img_width=1.0, img_height=1.0):
-    """Convert YOLO format (x_center, y_center, width, height) to (x1, y1, x2, y2)"""
-    x1 = (x_center - width/2) * img_width
-    y1 = (y_center - height/2) * img_height
-    x2 = (x_center + width/2) * img_width
-    y2 = (y_center + height/2) * img_height
-    return [int(x1), int(y1), int(x2), int(y2)]
+def render_label(label, color):
+    """Render a label as drawn above a bbox: white text on a filled box of the class color"""
+    (label_width, label_height), _ = cv2.getTextSize(
+        label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    overlay = np.empty((label_height + 6, label_width + 6, 3), dtype=np.uint8)
+    overlay[:] = color
+    cv2.putText(overlay, label, (0, label_height),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return overlay
+
+
+def paste_overlay(image, overlay, x, y):
+    """Copy overlay into image with its top-left corner at (x, y), clipped to the image"""
+    height, width = overlay.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, image.shape[1]), min(y + height, image.shape[0])
+    if x0 < x1 and y0 < y1:
+        image[y0:y1, x0:x1] = overlay[y0 - y:y1 - y, x0 - x:x1 - x]
 
 
 try:
@@ -29,53 +40,50 @@ try:
     img_height, img_width = image.shape[:2]
     print(f"Image dimensions: {img_width}x{img_height}")
 
-    # Generate random colors for each class
-    np.random.seed(42)  # for reproducibility
-    colors = np.random.randint(0, 255, size=(100, 3), dtype=np.uint8).tolist()
-
     # Read class names
     print("Reading class names...")
     with open('classes.txt', 'r') as f:
         classes = [line.strip() for line in f.readlines()]
     print(f"Found {len(classes)} classes")
 
+    # Generate random colors for each class, seeded for reproducibility
+    colors = np.random.default_rng(42).integers(
+        0, 255, size=(len(classes), 3), dtype=np.uint8)
+
     # Read annotations
     print("Reading annotations...")
+    labels = np.loadtxt('labels/image.txt').reshape(-1, 5)
+    class_ids = labels[:, 0].astype(np.int32)
+
+    # Convert YOLO format (x_center, y_center, width, height) to
+    # (x1, y1, x2, y2) format with actual image dimensions
+    x_center, y_center, width, height = labels[:, 1:].T
+    bboxes = np.stack([(x_center - width/2) * img_width,
+                       (y_center - height/2) * img_height,
+                       (x_center + width/2) * img_width,
+                       (y_center + height/2) * img_height], axis=1).astype(np.int32)
+
     annotations = []
-    with open('labels/image.txt', 'r') as f:
-        for line in f.readlines():
-            parts = line.strip().split()
-            if len(parts) == 5:
-                class_id = int(parts[0])
-                x_center = float(parts[1])
-                y_center = float(parts[2])
-                width = float(parts[3])
-                height = float(parts[4])
-
-                # Convert to x1,y1,x2,y2 format with actual image dimensions
-                bbox = yolo_to_bbox(x_center, y_center, width,
-                                    height, img_width, img_height)
-
-                # Draw bounding box
-                color = colors[class_id]
-                cv2.rectangle(image, (bbox[0], bbox[1]),
-                              (bbox[2], bbox[3]), color, 2)
-
-                # Add label
-                label = f'{classes[class_id]}'
-                (label_width, label_height), _ = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                cv2.rectangle(image, (bbox[0], bbox[1] - label_height - 5),
-                              (bbox[0] + label_width + 5, bbox[1]), color, -1)
-                cv2.putText(image, label, (bbox[0], bbox[1] - 5),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-                annotation = {
-                    'class': classes[class_id],
-                    'class_id': class_id,
-                    'bbox': bbox
-                }
-                annotations.append(annotation)
+    label_cache = {}
+    for class_id, bbox in zip(class_ids.tolist(), bboxes.tolist()):
+        # Draw bounding box
+        color = tuple(int(c) for c in colors[class_id])
+        cv2.rectangle(image, (bbox[0], bbox[1]),
+                      (bbox[2], bbox[3]), color, 2)
+
+        # Add label, rendering it only once per class
+        if class_id not in label_cache:
+            label_cache[class_id] = render_label(f'{classes[class_id]}', color)
+        label_image = label_cache[class_id]
+        paste_overlay(image, label_image, bbox[0],
+                      bbox[1] - label_image.shape[0] + 1)
+
+        annotation = {
+            'class': classes[class_id],
+            'class_id': class_id,
+            'bbox': bbox
+        }
+        annotations.append(annotation)
 
     print(f"Processed {len(annotations)} annotations")
 
@@ -91,8 +99,8 @@ try:
 
     json_path = 'annotations.json'
     print(f"Saving annotations to: {json_path}")
-    with open(json_path, 'w') as f:
-        json.dump(output, f, indent=2)
+    with open(json_path, 'wb') as f:
+        f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
 
     print(
         f"Successfully converted {len(annotations)} annotations to {json_path}")
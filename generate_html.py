@@ -1,10 +1,10 @@
-import json
-from typing import List, Dict, Any, Optional, Set
-from dataclasses import dataclass
+import orjson
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, asdict
 import numpy as np
 
 
-@dataclass
+@dataclass(slots=True)
 class BBox:
     """A bounding box class representing a rectangular region.
 
@@ -28,13 +28,19 @@ class BBox:
 
         Returns:
             bool: True if this box contains the other box's center, has larger area,
-                 and has significant overlap (>50%), False otherwise
+                 and has significant overlap (>60%), False otherwise
         """
-        # Calculate center point of other bbox
+        # Calculate the intersection, bailing out early if the boxes are disjoint
+        x_left = max(self.x1, child.x1)
+        y_top = max(self.y1, child.y1)
+        x_right = min(self.x2, child.x2)
+        y_bottom = min(self.y2, child.y2)
+        if x_right <= x_left or y_bottom <= y_top:
+            return False
+
+        # Check if center point of other bbox lies within this bbox
         child_center_x = (child.x1 + child.x2) / 2
         child_center_y = (child.y1 + child.y2) / 2
-
-        # Check if center point lies within this bbox
         center_contained = (self.x1 <= child_center_x <= self.x2 and
                             self.y1 <= child_center_y <= self.y2)
 
@@ -42,10 +48,10 @@ class BBox:
         self_area = (self.x2 - self.x1) * (self.y2 - self.y1)
         child_area = (child.x2 - child.x1) * (child.y2 - child.y1)
 
-        # Calculate overlap ratio
-        overlap = child.overlap_ratio(self)
+        # Overlap ratio of the intersection with respect to the child's area
+        overlap = (x_right - x_left) * (y_bottom - y_top) / child_area
 
-        # Return true if center is contained, this box has larger area, and overlap > 80%
+        # Return true if center is contained, this box has larger area, and overlap > 60%
         return center_contained and self_area > child_area and overlap > 0.6
 
     def overlap_ratio(self, child: 'BBox') -> float:
@@ -84,9 +90,11 @@ class Element:
         class_name (str): The CSS class name of the element
         bbox (BBox): The bounding box coordinates of the element
         class_id (int, optional): Numeric identifier for the element class
-        children (Set[Element]): Set of child elements contained within this element
+        children (List[Element]): List of child elements contained within this element
     """
 
+    __slots__ = ('class_name', 'bbox', 'class_id', 'children', '_flex_dir')
+
     def __init__(self, class_name: str, bbox: BBox, class_id: int = None):
         """Initialize an Element instance.
 
@@ -98,41 +106,8 @@ class Element:
         self.class_name = class_name
         self.bbox = bbox
         self.class_id = class_id
-        self.children: Set[Element] = set()
-
-    def add_child(self, child: 'Element') -> None:
-        """Add a child element to this element's children.
-
-        This method handles the hierarchical relationship between elements by:
-        1. Checking if the child should become a parent of existing children
-        2. Checking if the child should be nested under an existing child
-        3. Adding the child directly if no special relationship exists
-
-        Args:
-            child (Element): The element to add as a child
-        """
-        # Don't add if it's already a child
-        if child in self.children:
-            return
-
-        # First check if any existing child should be a child of the new element
-        children_to_move = set()
-        for existing_child in self.children:
-            if child.bbox.contains(existing_child.bbox):
-                children_to_move.add(existing_child)
-                child.add_child(existing_child)
-
-        # Remove any children that were moved to the new child
-        self.children -= children_to_move
-
-        # Then check if the new child should be a child of any existing child
-        for existing_child in self.children:
-            if existing_child.bbox.contains(child.bbox):
-                existing_child.add_child(child)
-                return
-
-        # If we get here, add the child directly to this element
-        self.children.add(child)
+        self.children: List[Element] = []
+        self._flex_dir: Optional[str] = None
 
     def pretty_print(self, indent: int = 0) -> None:
         """Pretty print this element and its children with indentation.
@@ -140,18 +115,26 @@ class Element:
         Args:
             indent (int): Number of spaces to indent this element
         """
-        print(" " * indent +
-              f"Element(class='{self.class_name}', bbox={vars(self.bbox)}, class_id={self.class_id})")
-        for child in sorted(self.children, key=lambda x: x.class_name):
-            child.pretty_print(indent + 2)
-            # print(child.class_name)
+        stack = [(self, indent)]
+        while stack:
+            element, indent = stack.pop()
+            print(" " * indent +
+                  f"Element(class='{element.class_name}', bbox={asdict(element.bbox)}, class_id={element.class_id})")
+            stack.extend((child, indent + 2) for child in reversed(element.children))
+
+
+def _var(values: List[float]) -> float:
+    """Population variance of a short sequence of numbers."""
+    mean = sum(values) / len(values)
+    return sum((v - mean) * (v - mean) for v in values) / len(values)
 
 
 def determine_flex_direction(element: Element) -> str:
     """Determine if children are arranged in a row or column.
 
-    Uses standard deviation of coordinates to determine alignment.
-    Lower standard deviation indicates better alignment along that axis.
+    Uses the variance of coordinates to determine alignment.
+    Lower variance indicates better alignment along that axis.
+    The result is cached on the element.
 
     Args:
         element: The parent element whose children's arrangement is being determined
@@ -159,59 +142,227 @@ def determine_flex_direction(element: Element) -> str:
     Returns:
         str: 'flex-row' for horizontal arrangement, 'flex-col' for vertical
     """
+    if element._flex_dir is not None:
+        return element._flex_dir
+
     if not element.children:
-        return "flex-col"  # Default if no children
+        element._flex_dir = "flex-col"  # Default if no children
+        return element._flex_dir
 
     # Get center points of all children
-    points = []
-    for child in element.children:
-        x_center = (child.bbox.x1 + child.bbox.x2) / 2
-        y_center = (child.bbox.y1 + child.bbox.y2) / 2
-        points.append((x_center, y_center))
-
-    x_coords, y_coords = zip(*points)  # Separate x and y coordinates
+    x_coords = [(child.bbox.x1 + child.bbox.x2) / 2 for child in element.children]
+    y_coords = [(child.bbox.y1 + child.bbox.y2) / 2 for child in element.children]
 
-    std_x = np.std(x_coords)  # Standard deviation of x values
-    std_y = np.std(y_coords)  # Standard deviation of y values
+    var_x = _var(x_coords)  # Variance of x values
+    var_y = _var(y_coords)  # Variance of y values
 
-    # Lower standard deviation indicates better alignment along that axis
+    # Lower variance indicates better alignment along that axis
     # For row layout, x coordinates should vary more than y coordinates
-    return "flex-row" if std_x > std_y else "flex-col"
+    element._flex_dir = "flex-row" if var_x > var_y else "flex-col"
+    return element._flex_dir
 
 
 def get_children_order(orientation: str, element: Element) -> List[Element]:
+    # Ties along the main axis are broken by the cross axis position
     if orientation == "flex-row":
-        return sorted(element.children, key=lambda x: x.bbox.x1)
+        return sorted(element.children, key=lambda x: (x.bbox.x1, x.bbox.y1))
     else:
-        return sorted(element.children, key=lambda x: x.bbox.y1)
+        return sorted(element.children, key=lambda x: (x.bbox.y1, x.bbox.x1))
 
 
 def load_annotations(annotations_file: str) -> List[any]:
-    with open(annotations_file, 'r') as f:
-        content = json.load(f)
+    with open(annotations_file, 'rb') as f:
+        content = orjson.loads(f.read())
     annotations = content["annotations"]
     return annotations
 
 
-def parse_annotations(annotations: List[any]) -> List[Element]:
-    elements = []
-    for annotation in annotations:
-        bbox = BBox(annotation["bbox"][0], annotation["bbox"]
-                    [1], annotation["bbox"][2], annotation["bbox"][3])
-        element = Element(annotation["class"], bbox, annotation["class_id"])
-        elements.append(element)
-    return elements
+def parse_annotations(annotations: List[any]) -> Tuple[np.ndarray, List[str], List[int]]:
+    bboxes = np.array([annotation["bbox"] for annotation in annotations],
+                      dtype=np.int32).reshape(-1, 4)
+    class_names = [annotation["class"] for annotation in annotations]
+    class_ids = [annotation["class_id"] for annotation in annotations]
+    return bboxes, class_names, class_ids
+
+
+def box_contains(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of ``BBox.contains``.
+
+    Everything is computed in integer arithmetic: the center test compares
+    doubled coordinates and the overlap test ``inter / inner_area > 0.6`` is
+    evaluated as ``5 * inter > 3 * inner_area``, which avoids float
+    temporaries and the division by zero for degenerate boxes.
+
+    Args:
+        outer: An (..., 4) array of candidate parent ``x1, y1, x2, y2`` rows
+        inner: An (..., 4) array of candidate child rows, broadcastable
+            against ``outer``
+
+    Returns:
+        np.ndarray: Boolean array that is True where the outer box contains
+            the inner one
+    """
+    outer = outer.astype(np.int64, copy=False)
+    inner = inner.astype(np.int64, copy=False)
+
+    outer_area = (outer[..., 2] - outer[..., 0]) * (outer[..., 3] - outer[..., 1])
+    inner_area = (inner[..., 2] - inner[..., 0]) * (inner[..., 3] - inner[..., 1])
+
+    # Intersection of each pair of boxes
+    tl = np.maximum(outer[..., :2], inner[..., :2])
+    br = np.minimum(outer[..., 2:], inner[..., 2:])
+    wh = np.clip(br - tl, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+
+    # Check if the (doubled) center point of each candidate child lies within
+    # the (doubled) box
+    center = inner[..., :2] + inner[..., 2:]
+    center_in = np.all((2 * outer[..., :2] <= center) & (center <= 2 * outer[..., 2:]), axis=-1)
+
+    return center_in & (outer_area > inner_area) & (5 * inter > 3 * inner_area)
 
 
-def create_tree(elements: List[Element]) -> Element:
-    # Sort elements by area in descending order to process larger boxes first
-    temp_elements = elements.copy()
+def _center_windows(boxes: np.ndarray, axis: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort boxes by center along an axis and find each box's run of centers.
+
+    Args:
+        boxes: An (N, 4) array of ``x1, y1, x2, y2`` rows
+        axis: 0 to sweep along x, 1 to sweep along y
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The box indices sorted by
+            center, and the start and end of each box's run in that order
+    """
+    # Doubled center keeps the comparison in integers
+    center = boxes[:, axis] + boxes[:, axis + 2]
+    by_center = np.argsort(center, kind="stable")
+    sorted_center = center[by_center]
+
+    lo = np.searchsorted(sorted_center, 2 * boxes[:, axis], side="left")
+    hi = np.searchsorted(sorted_center, 2 * boxes[:, axis + 2], side="right")
+    return by_center, lo, hi
+
+
+def candidate_pairs(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the (parent, child) index pairs worth testing for containment.
+
+    A box can only contain boxes whose center lies within its x and y range,
+    so the boxes are swept along one axis and every box is paired with the
+    contiguous run of centers falling inside its extent (found by binary
+    search) instead of with every other box. The axis producing fewer pairs
+    is used; for full-width rows such as headers and sections this is
+    usually y.
+
+    Args:
+        boxes: An (N, 4) array of ``x1, y1, x2, y2`` rows
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Two equally long index arrays of
+            candidate parents and children
+    """
+    by_center, lo, hi = min((_center_windows(boxes, axis) for axis in (0, 1)),
+                            key=lambda w: (w[2] - w[1]).sum())
+    counts = hi - lo
+
+    # Expand every [lo, hi) run into explicit pairs
+    parents = np.repeat(np.arange(len(boxes)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    children = by_center[np.repeat(lo, counts) + offsets]
+    return parents, children
+
+
+def create_tree(boxes: np.ndarray, class_names: List[str], class_ids: List[int]) -> Element:
     root = Element("root", BBox(0, 0, 0, 0))
-    for element in temp_elements:
-        root.add_child(element)
+    if not len(boxes):
+        return root
+
+    elements = [Element(class_name, BBox(*bbox), class_id)
+                for class_name, bbox, class_id in zip(class_names, boxes.tolist(), class_ids)]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    parents, children = candidate_pairs(boxes)
+    mask = box_contains(boxes[parents], boxes[children])
+    parents, children = parents[mask], children[mask]
+
+    # Rank the boxes by area, largest first, and attach every element to the
+    # highest ranked (i.e. smallest) box that contains it
+    order = np.argsort(-areas, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    best = np.full(len(elements), -1)
+    np.maximum.at(best, children, rank[parents])
+    parent = np.where(best >= 0, order[best], -1)
+
+    # Group child indices per parent; the extra last slot collects the
+    # top-level elements, which have a parent index of -1
+    child_ids: List[List[int]] = [[] for _ in range(len(elements) + 1)]
+    for i, p in enumerate(parent.tolist()):
+        child_ids[p].append(i)
+
+    # Children are stored sorted by class name so that pretty_print can walk
+    # them directly
+    for element, ids in zip([*elements, root], child_ids):
+        element.children = sorted((elements[i] for i in ids), key=lambda x: x.class_name)
     return root
 
 
+# HTML tag for each element class, anything else becomes a div
+ELEMENT_TAGS = {
+    "button": "button",
+    "heading": "h2",
+    "paragraph": "p",
+    "image": "img",
+    "input": "input",
+    "span": "span",
+    "text": "span",
+    "header": "header",
+    "footer": "footer",
+    "section": "section",
+}
+
+# Tailwind classes for element classes that do not depend on layout
+BASE_CLASSES = "relative "
+STATIC_CLASSES = {
+    "button": BASE_CLASSES + "px-4 py-2 bg-blue-500 text-white rounded hover:bg-blue-600",
+    "grid": BASE_CLASSES + "grid grid-cols-3 gap-4",
+    "heading": BASE_CLASSES + "text-2xl font-bold mb-4",
+    "icon": BASE_CLASSES + "w-6 h-6",
+    "image": BASE_CLASSES + "object-cover",
+    "input": BASE_CLASSES + "border rounded px-3 py-2 focus:outline-none focus:ring-2",
+    "paragraph": BASE_CLASSES + "text-gray-600 leading-relaxed",
+    "text": BASE_CLASSES + "text-gray-800",
+}
+
+# Tailwind classes for flex containers, precomputed for both flex directions
+_FLEX_CLASS_TEMPLATES = {
+    "div": "flex {} gap-4",
+    "div-bg": "flex {} gap-4",
+    "footer": "flex {} items-center justify-between w-full bg-gray-100 p-4",
+    "header": "flex {} items-center justify-between w-full bg-white p-4",
+    "list": "flex {} gap-2",
+    "section": "flex {} gap-6 p-6",
+    "span": "flex {} gap-2",
+}
+FLEX_CLASSES = {
+    class_name: {flex_dir: BASE_CLASSES + template.format(flex_dir)
+                 for flex_dir in ("flex-row", "flex-col")}
+    for class_name, template in _FLEX_CLASS_TEMPLATES.items()
+}
+
+# Opening tag templates for elements with placeholder content
+_TAG_ATTRS = "class='{classes}' data-id='{class_id}' data-type='{class_name}'"
+OPEN_TAG_TEMPLATES = {
+    "image": "{indent}<{tag} src='https://picsum.photos/{width}/{height}?random=1' alt='Placeholder' " + _TAG_ATTRS + ">\n",
+    "button": "{indent}<{tag} " + _TAG_ATTRS + ">Click me\n",
+    "heading": "{indent}<{tag} " + _TAG_ATTRS + ">Sample Heading\n",
+    "paragraph": "{indent}<{tag} " + _TAG_ATTRS + ">Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.\n",
+    "input": "{indent}<{tag} type='text' placeholder='Enter text here...' " + _TAG_ATTRS + ">\n",
+    "text": "{indent}<{tag} " + _TAG_ATTRS + ">Sample text\n",
+    "span": "{indent}<{tag} " + _TAG_ATTRS + ">Sample text\n",
+}
+DEFAULT_OPEN_TAG_TEMPLATE = "{indent}<{tag} " + _TAG_ATTRS + ">\n"
+
+
 def generate_html(root: Element) -> str:
     """Generate HTML markup for the element tree with Tailwind CSS classes.
 
@@ -223,123 +374,71 @@ def generate_html(root: Element) -> str:
     """
     def get_tailwind_classes(element: Element) -> str:
         """Get appropriate Tailwind classes based on element type."""
-        base_classes = "relative "
-
-        match element.class_name:
-            case "button":
-                return base_classes + "px-4 py-2 bg-blue-500 text-white rounded hover:bg-blue-600"
-            case "div" | "div-bg":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} gap-4"
-            case "footer":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} items-center justify-between w-full bg-gray-100 p-4"
-            case "grid":
-                return base_classes + "grid grid-cols-3 gap-4"
-            case "header":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} items-center justify-between w-full bg-white p-4"
-            case "heading":
-                return base_classes + "text-2xl font-bold mb-4"
-            case "icon":
-                return base_classes + "w-6 h-6"
-            case "image":
-                return base_classes + "object-cover"
-            case "input":
-                return base_classes + "border rounded px-3 py-2 focus:outline-none focus:ring-2"
-            case "list":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} gap-2"
-            case "paragraph":
-                return base_classes + "text-gray-600 leading-relaxed"
-            case "section":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} gap-6 p-6"
-            case "span":
-                flex_dir = determine_flex_direction(element)
-                return base_classes + f"flex {flex_dir} gap-2"
-            case "text":
-                return base_classes + "text-gray-800"
-            case _:
-                return base_classes
+        flex_classes = FLEX_CLASSES.get(element.class_name)
+        if flex_classes is not None:
+            return flex_classes[determine_flex_direction(element)]
+        return STATIC_CLASSES.get(element.class_name, BASE_CLASSES)
 
     def get_element_tag(class_name: str) -> str:
         """Get appropriate HTML tag based on element class."""
-        match class_name:
-            case "button":
-                return "button"
-            case "heading":
-                return "h2"
-            case "paragraph":
-                return "p"
-            case "image":
-                return "img"
-            case "input":
-                return "input"
-            case "span":
-                return "span"
-            case "text":
-                return "span"
-            case "header":
-                return "header"
-            case "footer":
-                return "footer"
-            case "section":
-                return "section"
-            case _:
-                return "div"
-
-    def generate_element_html(element: Element, indent: int = 0) -> str:
-        """Recursively generate HTML for an element and its children."""
-        if not element:
-            return ""
-
-        # Skip root element
-        if element.class_name == "root":
-            return "".join(generate_element_html(child, indent) for child in get_children_order(determine_flex_direction(element), element))
-
-        indent_str = "  " * indent
-        tag = get_element_tag(element.class_name)
-        classes = get_tailwind_classes(element)
-
-        # Calculate dimensions for image placeholders
-        width = element.bbox.x2 - element.bbox.x1
-        height = element.bbox.y2 - element.bbox.y1
-
-        # Opening tag with appropriate placeholder content
-        match element.class_name:
-            case "image":
-                html = f"{indent_str}<{tag} src='https://picsum.photos/{width}/{height}?random=1' alt='Placeholder' class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>\n"
-            case "button":
-                html = f"{indent_str}<{tag} class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>Click me\n"
-            case "heading":
-                html = f"{indent_str}<{tag} class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>Sample Heading\n"
-            case "paragraph":
-                html = f"{indent_str}<{tag} class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.\n"
-            case "input":
-                html = f"{indent_str}<{tag} type='text' placeholder='Enter text here...' class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>\n"
-            case "text" | "span":
-                html = f"{indent_str}<{tag} class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>Sample text\n"
-            case _:
-                html = f"{indent_str}<{tag} class='{classes}' data-id='{element.class_id}' data-type='{element.class_name}'>\n"
-
-        # Only process children for non-self-closing tags
-        if element.class_name not in ["image", "input"]:
-            # Get flex direction for ordering children
-            flex_dir = determine_flex_direction(element)
-            if (element.class_name == "header"):
-                print(flex_dir)
-            # Generate children HTML in correct order
-            ordered_children = get_children_order(flex_dir, element)
-            for child in ordered_children:
-                html += generate_element_html(child, indent + 1)
-
-            # Closing tag
-            html += f"{indent_str}</{tag}>\n"
-
-        return html
-
-    return generate_element_html(root)
+        return ELEMENT_TAGS.get(class_name, "div")
+
+    def generate_element_html(element: Element, indent: int, out: List[str]) -> None:
+        """Append the HTML fragments for an element and its children to out.
+
+        The tree is walked with an explicit stack holding either an
+        (element, indent) pair still to be opened or a pending closing tag,
+        so deep trees do not run into the recursion limit.
+        """
+        stack: List[Any] = [(element, indent)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                # Closing tag
+                out.append(item)
+                continue
+
+            element, indent = item
+
+            # Skip root element
+            if element.class_name == "root":
+                ordered_children = get_children_order(determine_flex_direction(element), element)
+                stack.extend((child, indent) for child in reversed(ordered_children))
+                continue
+
+            indent_str = "  " * indent
+            tag = get_element_tag(element.class_name)
+            classes = get_tailwind_classes(element)
+
+            # Calculate dimensions for image placeholders
+            width = element.bbox.x2 - element.bbox.x1
+            height = element.bbox.y2 - element.bbox.y1
+
+            # Opening tag with appropriate placeholder content
+            template = OPEN_TAG_TEMPLATES.get(element.class_name, DEFAULT_OPEN_TAG_TEMPLATE)
+            out.append(template.format_map({
+                "indent": indent_str,
+                "tag": tag,
+                "classes": classes,
+                "class_id": element.class_id,
+                "class_name": element.class_name,
+                "width": width,
+                "height": height,
+            }))
+
+            # Only process children for non-self-closing tags
+            if element.class_name not in ["image", "input"]:
+                # Get flex direction for ordering children
+                flex_dir = determine_flex_direction(element)
+                # Children are pushed in reverse so they pop in the correct
+                # order, followed by the closing tag
+                ordered_children = get_children_order(flex_dir, element)
+                stack.append(f"{indent_str}</{tag}>\n")
+                stack.extend((child, indent + 1) for child in reversed(ordered_children))
+
+    parts: List[str] = []
+    generate_element_html(root, 0, parts)
+    return "".join(parts)
 
 
 def create_html_file(annotations_file: str, output_file: str):
@@ -355,9 +454,9 @@ def create_html_file(annotations_file: str, output_file: str):
 <body>
 """
     annotations = load_annotations(annotations_file)
-    elements = parse_annotations(annotations)
+    bboxes, class_names, class_ids = parse_annotations(annotations)
 
-    root = create_tree(elements)
+    root = create_tree(bboxes, class_names, class_ids)
 
     html += generate_html(root)
 
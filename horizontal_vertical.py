@@ -1,15 +1,18 @@
-import numpy as np
+def _var(values):
+    mean = sum(values) / len(values)
+    return sum((v - mean) * (v - mean) for v in values) / len(values)
 
 
 def check_approx_alignment(points, tolerance=0.5):
     x_coords, y_coords = zip(*points)  # Separate x and y coordinates
 
-    std_x = np.std(x_coords)  # Standard deviation of x values
-    std_y = np.std(y_coords)  # Standard deviation of y values
+    var_x = _var(x_coords)  # Variance of x values
+    var_y = _var(y_coords)  # Variance of y values
 
-    if std_y <= tolerance:
+    # Compare variances against the squared tolerance, no sqrt needed
+    if var_y <= tolerance * tolerance:
         return "Approximately Horizontally Aligned"
-    elif std_x <= tolerance:
+    elif var_x <= tolerance * tolerance:
         return "Approximately Vertically Aligned"
     else:
         return "Not Aligned"